@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import re
 from collections.abc import Callable, Iterable
 from datetime import datetime
 from typing import Any
@@ -10,6 +11,9 @@ from agents.base import BaseAgent
 from agents.tooling import ToolSpec
 from tools.document_parser import parse_document_with_llm
 
+# Sentence boundaries used when mining facts out of a free-text matter summary.
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
 
 class LDAAgent(BaseAgent):
     """Summarise the fact pattern from the incoming matter payload.
@@ -250,7 +254,6 @@ Then provide your complete factual analysis."""
         # FIX: Extract facts from matter.summary if fact_pattern_summary is empty
         # This handles cases where the web form puts detailed facts in summary instead of documents
         import logging
-        import re
         logger = logging.getLogger("themis.agents.lda")
         logger.info(f"Checking fact_pattern_summary: has {len(facts_payload.get('fact_pattern_summary', []))} facts")
 
@@ -260,7 +263,7 @@ Then provide your complete factual analysis."""
             if summary and len(summary) > 50:  # Only process if substantial summary exists
                 # Split summary into sentences and extract as individual facts
                 # Note: Router sanitizer may have replaced newlines with spaces, so split on periods primarily
-                sentences = re.split(r'(?<=[.!?])\s+', summary)
+                sentences = _SENTENCE_SPLIT_RE.split(summary)
                 extracted_facts = []
                 for sentence in sentences:
                     sentence = sentence.strip()
@@ -9,6 +9,8 @@ from collections.abc import Generator
 
 import pytest
 
+from tools import llm_client
+from tools.llm_client import LLMClient
 from tools.metrics import metrics_registry
 
 
@@ -49,6 +51,17 @@ def reset_metrics_registry() -> Generator[None, None, None]:
     metrics_registry.reset()
 
 
+@pytest.fixture(autouse=True)
+def clear_llm_client_caches() -> Generator[None, None, None]:
+    """Drop shared SDK clients and cached responses so mocks take effect."""
+
+    LLMClient._CLIENT_CACHE.clear()
+    llm_client._RESPONSE_CACHE.clear()
+    yield
+    LLMClient._CLIENT_CACHE.clear()
+    llm_client._RESPONSE_CACHE.clear()
+
+
 @pytest.fixture(autouse=True)
 def clear_api_key_environment(monkeypatch: pytest.MonkeyPatch) -> None:
     """Prevent API key configuration from leaking between tests."""
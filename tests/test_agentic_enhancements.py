@@ -15,13 +15,15 @@ from __future__ import annotations
 
 import json
 import os
+import subprocess
+import sys
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from tools.llm_client import LLMClient
-from tools.mcp_config import MCPConfig
+from tools.mcp_config import MCPConfig, get_mcp_config, set_mcp_config
 
 # Try to import LDA functions - skip tests if not available
 # Must be done early before pytest collects tests
@@ -51,13 +53,13 @@ class TestExtendedThinking:
         assert client.use_extended_thinking is False
 
     @pytest.mark.asyncio
-    @patch("tools.llm_client.Anthropic")
+    @patch("anthropic.AsyncAnthropic")
     async def test_extended_thinking_adds_headers(self, mock_anthropic):
         """Verify extended thinking adds correct API headers."""
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.content = [MagicMock(type="text", text="response")]
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
 
         client = LLMClient(api_key="test-key", use_extended_thinking=True)
@@ -68,7 +70,7 @@ class TestExtendedThinking:
         assert "anthropic-beta" in call_args.kwargs.get("extra_headers", {})
 
     @pytest.mark.asyncio
-    @patch("tools.llm_client.Anthropic")
+    @patch("anthropic.AsyncAnthropic")
     async def test_thinking_blocks_logged(self, mock_anthropic):
         """Verify thinking blocks are logged but not returned."""
         mock_client = MagicMock()
@@ -77,7 +79,7 @@ class TestExtendedThinking:
             MagicMock(type="thinking", thinking="internal reasoning here"),
             MagicMock(type="text", text="final response"),
         ]
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
 
         client = LLMClient(api_key="test-key", use_extended_thinking=True)
@@ -101,13 +103,13 @@ class TestPromptCaching:
         assert client.use_prompt_caching is False
 
     @pytest.mark.asyncio
-    @patch("tools.llm_client.Anthropic")
+    @patch("anthropic.AsyncAnthropic")
     async def test_cache_control_headers_added(self, mock_anthropic):
         """Verify cache control headers are added when caching enabled."""
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.content = [MagicMock(type="text", text="response")]
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
 
         client = LLMClient(api_key="test-key", use_prompt_caching=True)
@@ -119,13 +121,13 @@ class TestPromptCaching:
         assert call_args.kwargs["extra_headers"]["anthropic-cache-control"] == "ephemeral+extended"
 
     @pytest.mark.asyncio
-    @patch("tools.llm_client.Anthropic")
+    @patch("anthropic.AsyncAnthropic")
     async def test_system_prompt_has_cache_control(self, mock_anthropic):
         """Verify system prompt includes cache_control when caching enabled."""
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.content = [MagicMock(type="text", text="response")]
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
 
         client = LLMClient(api_key="test-key", use_prompt_caching=True)
@@ -154,13 +156,13 @@ class TestCodeExecution:
         assert client.enable_code_execution is True
 
     @pytest.mark.asyncio
-    @patch("tools.llm_client.Anthropic")
+    @patch("anthropic.AsyncAnthropic")
     async def test_code_execution_tool_registered(self, mock_anthropic):
         """Verify code execution tool is registered when enabled."""
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.content = [MagicMock(type="text", text="response")]
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
 
         client = LLMClient(api_key="test-key", enable_code_execution=True)
@@ -176,7 +178,7 @@ class TestCodeExecution:
 class TestFilesAPI:
     """Test Files API functionality."""
 
-    @patch("tools.llm_client.Anthropic")
+    @patch("anthropic.Anthropic")
     def test_upload_file_success(self, mock_anthropic):
         """Test successful file upload."""
         mock_client = MagicMock()
@@ -205,7 +207,7 @@ class TestFilesAPI:
         with pytest.raises(ValueError, match="File upload requires ANTHROPIC_API_KEY"):
             client.upload_file("/tmp/test.txt")
 
-    @patch("tools.llm_client.Anthropic")
+    @patch("anthropic.Anthropic")
     def test_list_files(self, mock_anthropic):
         """Test listing uploaded files."""
         mock_client = MagicMock()
@@ -223,7 +225,7 @@ class TestFilesAPI:
         assert files[0]["filename"] == "doc1.pdf"
         assert files[1]["id"] == "file_2"
 
-    @patch("tools.llm_client.Anthropic")
+    @patch("anthropic.Anthropic")
     def test_delete_file(self, mock_anthropic):
         """Test deleting a file."""
         mock_client = MagicMock()
@@ -236,13 +238,13 @@ class TestFilesAPI:
         mock_client.files.delete.assert_called_once_with("file_abc123")
 
     @pytest.mark.asyncio
-    @patch("tools.llm_client.Anthropic")
+    @patch("anthropic.AsyncAnthropic")
     async def test_generate_with_file_ids(self, mock_anthropic):
         """Test generating text with file references."""
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.content = [MagicMock(type="text", text="analysis complete")]
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
 
         client = LLMClient(api_key="test-key")
@@ -352,6 +354,45 @@ class TestMCPConfig:
         assert servers[1]["url"] == "https://s2.com"
         assert "api_key" not in servers[1]
 
+    def test_mcp_config_discovers_parent_file_once(self, tmp_path, monkeypatch):
+        """Test .mcp.json discovery walks up from cwd and caches the result."""
+        config_file = tmp_path / ".mcp.json"
+        config_file.write_text(json.dumps({"servers": {}}))
+        nested = tmp_path / "a" / "b"
+        nested.mkdir(parents=True)
+        monkeypatch.chdir(nested)
+        set_mcp_config(None)
+
+        assert MCPConfig().config_path == config_file
+
+        config_file.unlink()
+        assert MCPConfig().config_path == config_file
+
+        set_mcp_config(None)
+        assert MCPConfig().config_path != config_file
+
+    def test_get_mcp_config_returns_override_or_shared_default(self, tmp_path):
+        """Test the global MCP config accessor honours set_mcp_config."""
+        override = MCPConfig(config_path=str(tmp_path / "missing.json"))
+        set_mcp_config(None)
+        default = get_mcp_config()
+        assert get_mcp_config() is default
+
+        set_mcp_config(override)
+        try:
+            assert get_mcp_config() is override
+        finally:
+            set_mcp_config(None)
+
+        assert get_mcp_config() is not override
+
+    def test_mcp_config_import_does_not_load_the_llm_client(self):
+        """Test MCP config loading stays independent of the LLM client."""
+        code = "import sys, tools.mcp_config; print('tools.llm_client' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        assert result.stdout.strip() == "False"
+
 
 @pytest.mark.skipif(not LDA_AVAILABLE, reason="LDA agent dependencies not available (pypdf/cryptography)")
 class TestLDAEnhancedTools:
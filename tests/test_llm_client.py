@@ -0,0 +1,663 @@
+"""Tests for :mod:`tools.llm_client`: stub-mode helpers and the Anthropic API path."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import subprocess
+import sys
+from collections.abc import Awaitable, Callable
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import anthropic
+import httpx
+import pytest
+
+from tools import llm_client
+from tools.llm_client import LLMClient
+
+
+@pytest.fixture
+def stub_client(monkeypatch: pytest.MonkeyPatch) -> LLMClient:
+    """Return an ``LLMClient`` forced into deterministic stub mode."""
+
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    client = LLMClient(api_key=None)
+    assert client._stub_mode is True
+    return client
+
+
+def test_stub_document_generator_returns_independent_copies(stub_client: LLMClient) -> None:
+    """Cached stub documents must not leak mutations between callers."""
+
+    llm_client._STUB_DOCUMENT_CACHE.clear()
+    prompt = "Generate a complete, professional complaint.\nParties: Ada Lovelace, Charles Babbage\n"
+
+    first = stub_client._stub_document_generator(prompt, "system")
+    first["full_document"] = "mutated"
+    second = stub_client._stub_document_generator(prompt, "system")
+
+    assert len(llm_client._STUB_DOCUMENT_CACHE) == 1
+    assert second["full_document"].startswith("SUPERIOR COURT OF CALIFORNIA")
+    assert "Ada Lovelace" in second["full_document"]
+
+
+@pytest.mark.parametrize(
+    "prompt, expected",
+    [
+        (
+            (
+                '{"parties": [{"role": "Defendant", "name": "Acme [Holdings]"}, '
+                '{"name": "Jane \\"JJ\\" Roe", "role": "plaintiff"}]}'
+            ),
+            ('Jane "JJ" Roe', "Acme [Holdings]"),
+        ),
+        (
+            # Invalid JSON (trailing comma) still resolves through the regex fallback.
+            '"parties": [{"name": "Sam Smith", "role": "Plaintiff"}, {"name": "Bo Co", "role": "Defendant"},]',
+            ("Sam Smith", "Bo Co"),
+        ),
+        (
+            '"parties": [{"name": "Bo Co", "role": "defendant"}, {"name": "Ann", "role": "Plaintiff"},]',
+            ("Ann", "Bo Co"),
+        ),
+        ("Parties: none listed", (None, None)),
+    ],
+)
+def test_extract_json_parties(prompt: str, expected: tuple[str | None, str | None]) -> None:
+    assert LLMClient._extract_json_parties(prompt) == expected
+
+
+@pytest.mark.asyncio
+async def test_api_calls_respect_max_concurrency() -> None:
+    """No more than ``max_concurrency`` Messages API calls run at once."""
+
+    in_flight = 0
+    peak = 0
+
+    async def fake_create(**_: object) -> MagicMock:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MagicMock(content=[MagicMock(type="text", text="ok")])
+
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = fake_create
+        client = LLMClient(api_key="test-key", max_concurrency=2)
+
+    results = await asyncio.gather(
+        *(client.generate_text("system", f"prompt {index}") for index in range(6))
+    )
+
+    assert results == ["ok"] * 6
+    assert peak == 2
+
+
+def test_concurrency_limit_survives_separate_event_loops() -> None:
+    async def slow_create(**_: object) -> MagicMock:
+        await asyncio.sleep(0.01)
+        return MagicMock(content=[MagicMock(type="text", text="ok")])
+
+    async def fan_out(client: LLMClient) -> list[str]:
+        return await asyncio.gather(*(client.generate_text("system", f"p{i}") for i in range(3)))
+
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = slow_create
+        client = LLMClient(api_key="test-key", max_concurrency=1, use_local_cache=False)
+
+        assert asyncio.run(fan_out(client)) == ["ok"] * 3
+        assert asyncio.run(fan_out(client)) == ["ok"] * 3
+
+
+def _status_error(status: int, headers: dict[str, str] | None = None) -> anthropic.APIStatusError:
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status, headers=headers, request=request)
+    return anthropic.APIStatusError("error", response=response, body=None)
+
+
+@pytest.mark.parametrize(
+    "exc, expected",
+    [
+        (anthropic.APIConnectionError(request=httpx.Request("POST", "https://x")), True),
+        (_status_error(409), True),
+        (_status_error(429), True),
+        (_status_error(529), True),
+        (_status_error(400), False),
+        (ValueError("bad json"), False),
+    ],
+)
+def test_is_transient_error(exc: BaseException, expected: bool) -> None:
+    assert llm_client._is_transient_error(exc) is expected
+
+
+def test_retry_delay_honours_retry_after_header() -> None:
+    assert llm_client._retry_delay(_status_error(429, {"retry-after": "3"}), 0) == 3.0
+    assert 0.0 <= llm_client._retry_delay(_status_error(503), 2) <= 0.4
+
+
+def test_env_number_falls_back_on_malformed_values(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    monkeypatch.setenv("THEMIS_LLM_CACHE_TTL", "1h")
+    with caplog.at_level(logging.WARNING, logger="themis.llm_client"):
+        assert llm_client._env_number("THEMIS_LLM_CACHE_TTL", 3600.0) == 3600.0
+    assert "THEMIS_LLM_CACHE_TTL" in caplog.text
+
+    monkeypatch.setenv("THEMIS_LLM_CACHE_TTL", "90")
+    assert llm_client._env_number("THEMIS_LLM_CACHE_TTL", 3600.0) == 90.0
+    monkeypatch.delenv("THEMIS_LLM_CACHE_TTL")
+    assert llm_client._env_number("THEMIS_LLM_CACHE_TTL", 3600.0) == 3600.0
+
+
+@pytest.mark.asyncio
+async def test_send_request_retries_only_transient_errors() -> None:
+    ok = MagicMock(content=[MagicMock(type="text", text="ok")])
+    create = AsyncMock(side_effect=[_status_error(529), _status_error(503), ok])
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = create
+        client = LLMClient(api_key="test-key", use_local_cache=False)
+
+    with patch.object(llm_client.asyncio, "sleep", AsyncMock()) as sleep:
+        assert await client.generate_text("system", "user") == "ok"
+        assert sleep.await_count == 2
+
+        create.side_effect = [_status_error(400)]
+        with pytest.raises(anthropic.APIStatusError):
+            await client.generate_text("system", "user")
+        assert sleep.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_structured_schema_sent_as_separate_cached_block() -> None:
+    """The schema instruction is its own cacheable system block."""
+
+    create = AsyncMock(return_value=MagicMock(content=[MagicMock(type="text", text='{"a": 1}')]))
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = create
+        client = LLMClient(api_key="test-key")
+    client.use_prompt_caching = True
+
+    result = await client.generate_structured("system", "user", response_format={"a": 0})
+
+    assert result == {"a": 1}
+    system = create.call_args.kwargs["system"]
+    assert [block["text"] for block in system] == [
+        "system",
+        'You MUST respond with valid JSON matching this schema:\n{\n  "a": 0\n}',
+    ]
+    assert all(block["cache_control"] == {"type": "ephemeral"} for block in system)
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ('Here you go: {"a": {"b": "}"}} and {"c": 2}', {"a": {"b": "}"}}),
+        ('{not json} then {"ok": true}', {"ok": True}),
+        ("no json here", None),
+        ('{"issues": [{"issue": "A"}], "score": 1,}', None),
+        ('{"note": "}{", "x": 1,} then {"ok": 1}', {"ok": 1}),
+    ],
+)
+def test_extract_json_object(content: str, expected: dict[str, object] | None) -> None:
+    assert llm_client._extract_json_object(content) == expected
+
+
+def test_dumps_round_trips_and_handles_non_string_keys() -> None:
+    assert llm_client._loads(llm_client._dumps({"a": [1, "b"]})) == {"a": [1, "b"]}
+    assert llm_client._loads(llm_client._dumps({1: "x"})) == {"1": "x"}
+
+
+def test_stub_keyword_regex_sees_overlapping_keywords() -> None:
+    hits = llm_client._match_stub_tool_groups("Build a TEXTIMELINE of the document")
+
+    assert hits == {"documents", "timeline", "drafting"}
+
+
+@pytest.mark.parametrize(
+    "prompt",
+    ["Draft the CLA\u0130M", "Draft the \u0130SSUE", "Draft the \u0131ssue", "Draft the \u017fettlement"],
+)
+def test_stub_keyword_regex_ignores_non_ascii_case_variants(prompt: str) -> None:
+    # Only ASCII letters fold, matching the substring test on prompt.lower().
+    assert llm_client._match_stub_tool_groups(prompt) == {"drafting"}
+
+
+@pytest.mark.asyncio
+async def test_generate_with_tools_runs_tool_calls_concurrently() -> None:
+    """Independent tool calls in one turn overlap and keep their order."""
+
+    in_flight = 0
+    peak = 0
+
+    async def slow_tool(value: int) -> dict[str, int]:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"value": value}
+
+    def tool_use(block_id: str, value: int) -> MagicMock:
+        block = MagicMock(type="tool_use", id=block_id, input={"value": value})
+        block.name = "slow_tool"
+        return block
+
+    responses = [
+        MagicMock(stop_reason="tool_use", content=[tool_use("a", 1), tool_use("b", 2)]),
+        MagicMock(stop_reason="end_turn", content=[MagicMock(type="text", text="done")]),
+    ]
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = AsyncMock(side_effect=responses)
+        client = LLMClient(api_key="test-key")
+
+    result = await client.generate_with_tools(
+        "system", "user", tools=[], tool_functions={"slow_tool": slow_tool}
+    )
+
+    assert result["result"] == "done"
+    assert [call["result"] for call in result["tool_calls"]] == [{"value": 1}, {"value": 2}]
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_generate_with_tools_retries_a_transient_error() -> None:
+    done = MagicMock(stop_reason="end_turn", content=[MagicMock(type="text", text="done")])
+    create = AsyncMock(side_effect=[_status_error(529), done])
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = create
+        client = LLMClient(api_key="test-key")
+
+    with patch.object(llm_client.asyncio, "sleep", AsyncMock()) as sleep:
+        result = await client.generate_with_tools("system", "user", tools=[], tool_functions={})
+
+    assert result["result"] == "done"
+    assert create.await_count == 2
+    assert sleep.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_file_ids_do_not_mutate_caller_messages() -> None:
+    create = AsyncMock(return_value=MagicMock(content=[MagicMock(type="text", text="ok")]))
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = create
+        client = LLMClient(api_key="test-key")
+    messages = [{"role": "user", "content": "summarise"}]
+
+    await client._call_anthropic_api("system", messages, 128, file_ids=["file_1"])
+
+    assert messages == [{"role": "user", "content": "summarise"}]
+    assert create.call_args.kwargs["messages"] == [
+        {
+            "role": "user",
+            "content": [
+                {"type": "file", "file": {"file_id": "file_1"}},
+                {"type": "text", "text": "summarise"},
+            ],
+        }
+    ]
+
+
+def test_with_cache_breakpoint_marks_only_a_copy_of_the_last_block() -> None:
+    messages = [
+        {"role": "user", "content": "start"},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "a", "content": "{}"}]},
+    ]
+
+    marked = llm_client._with_cache_breakpoint(messages)
+
+    assert marked[0] is messages[0]
+    assert marked[1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in messages[1]["content"][-1]
+    assert llm_client._with_cache_breakpoint(messages[:1])[0]["content"] == [
+        {"type": "text", "text": "start", "cache_control": {"type": "ephemeral"}}
+    ]
+
+
+def test_instances_share_the_async_sdk_client() -> None:
+    with patch("anthropic.AsyncAnthropic", side_effect=lambda **_: MagicMock()) as mock_anthropic:
+        first = LLMClient(api_key="test-key")
+        second = LLMClient(api_key="test-key", use_extended_thinking=False)
+        other = LLMClient(api_key="other-key")
+
+    assert first.client is second.client
+    assert other.client is not first.client
+    assert mock_anthropic.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_structured_output_uses_forced_tool_without_thinking() -> None:
+    tool_use = MagicMock(type="tool_use", input={"issues": [{"issue": "Negligence"}]})
+    tool_use.name = "emit_structured_output"
+    create = AsyncMock(return_value=MagicMock(content=[tool_use]))
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = create
+        client = LLMClient(api_key="test-key", use_extended_thinking=False)
+
+    result = await client.generate_structured(
+        "system", "user", response_format={"issues": [{"issue": "string"}], "score": 0}
+    )
+
+    assert result == {"issues": [{"issue": "Negligence"}]}
+    kwargs = create.call_args.kwargs
+    assert kwargs["tool_choice"] == {"type": "tool", "name": "emit_structured_output"}
+    assert kwargs["tools"][0]["input_schema"] == {
+        "type": "object",
+        "properties": {
+            "issues": {
+                "type": "array",
+                "items": {"type": "object", "properties": {"issue": {"type": "string"}}},
+            },
+            "score": {"type": "integer"},
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompts_are_served_from_the_response_cache() -> None:
+    create = AsyncMock(return_value=MagicMock(content=[MagicMock(type="text", text='{"a": [1]}')]))
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = create
+        client = LLMClient(api_key="test-key", use_local_cache=True)
+
+    first = await client.generate_structured("system", "user", response_format={"a": []})
+    first["a"].append(2)
+    second = await client.generate_structured("system", "user", response_format={"a": []})
+    await client.generate_text("system", "user")
+
+    assert second == {"a": [1]}
+    assert create.await_count == 2
+    assert llm_client._RESPONSE_CACHE.stats == {"hits": 1, "misses": 2}
+
+
+@pytest.mark.asyncio
+async def test_response_cache_is_off_by_default() -> None:
+    create = AsyncMock(return_value=MagicMock(content=[MagicMock(type="text", text="ok")]))
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = create
+        client = LLMClient(api_key="test-key")
+
+    await client.generate_text("system", "user")
+    await client.generate_text("system", "user")
+
+    assert create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_calls_share_one_request() -> None:
+    async def slow_create(**_: object) -> MagicMock:
+        await asyncio.sleep(0.01)
+        return MagicMock(content=[MagicMock(type="text", text="shared")])
+
+    create = AsyncMock(side_effect=slow_create)
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.create = create
+        client = LLMClient(api_key="test-key", use_local_cache=True)
+
+    results = await asyncio.gather(*(client.generate_text("system", "user") for _ in range(3)))
+
+    assert results == ["shared"] * 3
+    assert create.await_count == 1
+    assert client._inflight == {}
+
+
+def test_llm_cache_expires_and_evicts_entries() -> None:
+    cache = llm_client.LLMCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    expired = llm_client.LLMCache(ttl_seconds=0)
+    expired.set("a", 1)
+
+    assert expired.get("a") is None
+    assert len(expired) == 0
+    assert expired.stats == {"hits": 0, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_stream_text_yields_chunks() -> None:
+    async def text_stream():
+        for chunk in ("Hello", ", ", "world"):
+            yield chunk
+
+    stream = MagicMock()
+    stream.__aenter__ = AsyncMock(return_value=MagicMock(text_stream=text_stream()))
+    stream.__aexit__ = AsyncMock(return_value=False)
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.stream = MagicMock(return_value=stream)
+        client = LLMClient(api_key="test-key")
+
+    chunks = [chunk async for chunk in client.stream_text("system", "user")]
+
+    assert chunks == ["Hello", ", ", "world"]
+
+
+def _stream_context(chunks: tuple[str, ...], error: BaseException | None = None) -> MagicMock:
+    async def text_stream():
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+
+    stream = MagicMock()
+    stream.__aenter__ = AsyncMock(return_value=MagicMock(text_stream=text_stream()))
+    stream.__aexit__ = AsyncMock(return_value=False)
+    return stream
+
+
+@pytest.mark.asyncio
+async def test_stream_text_retries_only_before_the_first_chunk() -> None:
+    failed_open = MagicMock()
+    failed_open.__aenter__ = AsyncMock(side_effect=_status_error(529))
+    failed_open.__aexit__ = AsyncMock(return_value=False)
+    stream = MagicMock(
+        side_effect=[failed_open, _stream_context(("Hello",)), _stream_context(("Hi",), _status_error(529))]
+    )
+    with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+        mock_anthropic.return_value.messages.stream = stream
+        client = LLMClient(api_key="test-key")
+
+    with patch.object(llm_client.asyncio, "sleep", AsyncMock()):
+        assert [chunk async for chunk in client.stream_text("system", "user")] == ["Hello"]
+
+        chunks: list[str] = []
+        with pytest.raises(anthropic.APIStatusError):
+            async for chunk in client.stream_text("system", "user"):
+                chunks.append(chunk)
+
+    assert chunks == ["Hi"]
+    assert stream.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_text_in_stub_mode_yields_whole_response(stub_client: LLMClient) -> None:
+    chunks = [chunk async for chunk in stub_client.stream_text("system", "Summarise the matter.")]
+
+    expected = stub_client._generate_text_stub(
+        system_prompt="system", user_prompt="Summarise the matter.", max_tokens=4096
+    )
+    assert chunks == [expected]
+
+
+def test_shared_sdk_client_is_rebuilt_for_each_event_loop() -> None:
+    async def clients(client: LLMClient) -> tuple[object, object]:
+        return client.client, client.client
+
+    with patch("anthropic.AsyncAnthropic", side_effect=lambda **_: MagicMock()) as mock_anthropic:
+        client = LLMClient(api_key="test-key")
+        unbound = client.client
+        first_loop = asyncio.run(clients(client))
+        second_loop = asyncio.run(clients(client))
+
+    # The client built outside a loop is adopted by the first loop that uses it.
+    assert first_loop == (unbound, unbound)
+    assert second_loop[0] is second_loop[1]
+    assert second_loop[0] is not unbound
+    assert mock_anthropic.call_count == 2
+
+
+def test_importing_the_client_does_not_load_the_sdk() -> None:
+    """Stub-mode users should not pay for importing anthropic or httpx."""
+
+    code = (
+        "import sys, tools.llm_client; "
+        "print(sorted({'anthropic', 'httpx'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_request_template_tracks_setting_changes() -> None:
+    with patch("anthropic.AsyncAnthropic"):
+        client = LLMClient(api_key="test-key", use_extended_thinking=False)
+
+    first = client._build_request_params("system", [], 10)
+    assert client._build_request_params("other", [], 20)["extra_headers"] is first["extra_headers"]
+
+    client.use_extended_thinking = True
+    params = client._build_request_params("system", [], 10)
+
+    assert params["extended_thinking"] is True
+    assert params["extra_headers"]["anthropic-beta"] == "interleaved-thinking-2025-05-14"
+
+
+def test_dedupe_compares_dicts_and_lists_structurally() -> None:
+    items = [{"a": 1, "b": [1, 2]}, {"b": [1, 2], "a": 1}, [1, 2], "[1, 2]", [1, 2], {}, []]
+
+    assert LLMClient._dedupe(items) == [{"a": 1, "b": [1, 2]}, [1, 2], "[1, 2]", {}, []]
+
+
+def test_set_llm_client_overrides_the_default_singleton(stub_client: LLMClient) -> None:
+    default = llm_client.get_llm_client()
+    assert llm_client.get_llm_client() is default
+
+    llm_client.set_llm_client(stub_client)
+    try:
+        assert llm_client.get_llm_client() is stub_client
+    finally:
+        llm_client.set_llm_client(None)
+
+    assert llm_client.get_llm_client() is default
+
+
+async def test_stub_drafting_tools_overlap_when_composer_does_not_need_sections(
+    stub_client: LLMClient,
+) -> None:
+    composer_started = asyncio.Event()
+
+    async def section_generator(**_: object) -> dict[str, str]:
+        await asyncio.wait_for(composer_started.wait(), timeout=1)
+        return {"intro": "text"}
+
+    async def document_composer(
+        document_type: str,
+        citations: object,
+        jurisdiction: str,
+        matter: object,
+        sections: dict | None = None,
+    ) -> dict[str, object]:
+        composer_started.set()
+        return {"sections": sections}
+
+    result = await stub_client._generate_with_tools_stub(
+        system_prompt="system",
+        user_prompt="Draft the memorandum",
+        tools=[],
+        tool_functions={"section_generator": section_generator, "document_composer": document_composer},
+    )
+
+    assert [call["tool"] for call in result["tool_calls"]] == ["section_generator", "document_composer"]
+    assert result["tool_calls"][1]["result"] == {"sections": {}}
+
+
+async def _required_sections_composer(sections: dict, **_: object) -> dict[str, object]:
+    return {"sections": sections}
+
+
+async def _kwargs_composer(**kwargs: object) -> dict[str, object]:
+    return {"sections": kwargs["sections"]}
+
+
+@pytest.mark.parametrize("document_composer", [_required_sections_composer, _kwargs_composer])
+async def test_stub_drafting_tools_chain_when_composer_needs_sections(
+    stub_client: LLMClient, document_composer: Callable[..., Awaitable[dict[str, object]]]
+) -> None:
+    async def section_generator(**_: object) -> dict[str, str]:
+        return {"intro": "text"}
+
+    result = await stub_client._generate_with_tools_stub(
+        system_prompt="system",
+        user_prompt="Draft the memorandum",
+        tools=[],
+        tool_functions={"section_generator": section_generator, "document_composer": document_composer},
+    )
+
+    assert result["tool_calls"][1]["result"] == {"sections": {"intro": "text"}}
+
+
+@pytest.mark.parametrize(
+    ("template", "parts"),
+    [
+        (llm_client._COMPLAINT_TEMPLATE, llm_client._COMPLAINT_PARTS),
+        (llm_client._DEMAND_LETTER_TEMPLATE, llm_client._DEMAND_LETTER_PARTS),
+        (llm_client._GENERIC_DOCUMENT_TEMPLATE, llm_client._GENERIC_DOCUMENT_PARTS),
+    ],
+)
+def test_compiled_templates_render_like_format_map(template: str, parts: tuple) -> None:
+    values = {field: f"<{field}>" for _, field in parts if field is not None}
+
+    assert llm_client._render_template(parts, values) == template.format_map(values)
+
+
+@pytest.mark.parametrize(
+    "goals",
+    [
+        '{"settlement": "$50,000", "fallback": "$30,000"}',
+        "{'settlement': '$50,000', 'fallback': '$30,000'}",
+    ],
+)
+def test_strategy_stub_reads_json_and_repr_goals(stub_client: LLMClient, goals: str) -> None:
+    strategy = stub_client._stub_strategy_template(f"Client Goals: {goals}")
+
+    assert strategy["objectives"] == "$50,000"
+    assert strategy["positions"]["fallback"] == "$30,000"
+
+
+def test_strategy_stub_ignores_non_mapping_goals(stub_client: LLMClient) -> None:
+    strategy = stub_client._stub_strategy_template("Client Goals: true")
+
+    assert strategy["objectives"] == "Advance the client's negotiating posture"
+
+
+@pytest.mark.asyncio
+async def test_issue_spotter_ignores_non_ascii_case_variants_of_fact_keywords(
+    stub_client: LLMClient,
+) -> None:
+    result = await stub_client.generate_structured(
+        "system",
+        "The İnjury was severe. Negligence occurred after the collision.",
+        response_format={"issues": []},
+    )
+
+    assert result["issues"][0]["facts"] == ["Negligence occurred after the collision."]
+
+
+def test_issue_triggers_skip_non_ascii_look_alikes() -> None:
+    prompt = "\u017fettlement negl\u0130gence breach damage. Later: settlement and negligence."
+
+    assert llm_client._match_issue_triggers(prompt) == {"breach", "neglig", "damage", "settlement"}
+
+
+def test_demand_letter_keeps_bare_bullet_lines_as_empty_entries(stub_client: LLMClient) -> None:
+    letter = stub_client._generate_stub_demand_letter("Ann", "Bo Co", "- Rear-ended\n-\n• Injured", [])
+
+    assert "Rear-ended  Injured" in letter["full_document"]
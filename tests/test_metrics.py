@@ -3,10 +3,14 @@
 from __future__ import annotations
 
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
 
 from agents.lda import LDAAgent
 from api.main import metrics as metrics_endpoint
-from tools.metrics import metrics_registry
+from tools import metrics
+from tools.metrics import CounterMetric, HistogramMetric, metrics_registry
 
 
 def test_agent_run_metrics_recorded(sample_matter: dict[str, object]) -> None:
@@ -50,3 +54,66 @@ def test_metrics_endpoint_prometheus_output(sample_matter: dict[str, object]) ->
     assert "themis_agent_run_seconds_bucket" in body
     assert 'agent="lda"' in body
     assert body.endswith("\n")
+
+
+def test_histogram_bucket_lines_keep_le_in_sorted_label_position() -> None:
+    histogram = HistogramMetric("latency", "help", buckets=(1,))
+    histogram.observe(0.5, agent="lda", tool='say "hi"')
+    histogram.observe(2)
+
+    assert histogram.render()[2:] == [
+        'latency_bucket{le="1.0"} 0',
+        'latency_bucket{le="+Inf"} 1',
+        "latency_count 1",
+        "latency_sum 2.0",
+        'latency_bucket{agent="lda",le="1.0",tool="say \\"hi\\""} 1',
+        'latency_bucket{agent="lda",le="+Inf",tool="say \\"hi\\""} 1',
+        'latency_count{agent="lda",tool="say \\"hi\\""} 1',
+        'latency_sum{agent="lda",tool="say \\"hi\\""} 0.5',
+    ]
+
+
+def test_counter_render_picks_up_series_added_after_a_scrape() -> None:
+    counter = CounterMetric("calls_total", "help")
+    counter.inc(agent="lda")
+    assert counter.render()[2:] == ['calls_total{agent="lda"} 1.0']
+
+    counter.inc(agent="dea")
+    counter.inc(agent="lda")
+
+    assert counter.render()[2:] == ['calls_total{agent="dea"} 1.0', 'calls_total{agent="lda"} 2.0']
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("lda", "lda"), (200, "200"), (0.5, "0.5"), ('a\\b\n"c"', 'a\\\\b\\n\\"c\\"')],
+)
+def test_escape_label_value(value: object, expected: str) -> None:
+    assert metrics._escape_label_value(value) == expected
+
+
+def test_histogram_samples_report_cumulative_bucket_counts() -> None:
+    histogram = HistogramMetric("latency", "help", buckets=(0.5, 1, 5))
+    for value in (0.5, 0.7, 1, 3, 9, float("nan")):
+        histogram.observe(value)
+
+    [(_, bucket_counts, _, count)] = histogram.samples()
+
+    assert bucket_counts == [1, 3, 4, 5]
+    assert count == 6
+
+
+def test_metrics_count_every_update_from_concurrent_threads() -> None:
+    counter = CounterMetric("calls_total", "help")
+    histogram = HistogramMetric("latency", "help", buckets=(1,))
+
+    def record(worker: int) -> None:
+        for _ in range(2000):
+            counter.inc(worker=worker % 2)
+            histogram.observe(0.5, worker=worker % 2)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(record, range(8)))
+
+    assert sorted(value for _, value in counter.samples()) == [8000.0, 8000.0]
+    assert [count for *_, count in histogram.samples()] == [8000, 8000]
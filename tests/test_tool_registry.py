@@ -0,0 +1,18 @@
+"""Tests for :mod:`tools.registry`."""
+
+from __future__ import annotations
+
+from tools.registry import ToolRegistry
+
+
+def test_available_lists_names_sorted_without_duplicates() -> None:
+    registry = ToolRegistry()
+    registry.register("timeline", len)
+    registry.register("damages", len)
+    registry.register("timeline", str)
+
+    names = registry.available()
+    names.append("mutated")
+
+    assert registry.available() == ["damages", "timeline"]
+    assert registry.get("timeline") is str
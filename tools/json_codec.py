@@ -0,0 +1,32 @@
+"""JSON helpers shared by the tool modules, using ``orjson`` when installed."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+
+def loads(data: str | bytes) -> Any:
+    """Deserialise JSON, using ``orjson`` when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Serialise JSON compactly, using ``orjson`` when it can encode ``obj``."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            # e.g. non-string keys or integers beyond 64 bits
+            pass
+    return json.dumps(obj)
+
+
+__all__ = ["dumps", "loads"]
@@ -6,14 +6,41 @@ allowing Themis agents to connect to external tools and data sources.
 
 from __future__ import annotations
 
+import functools
 import json
 import logging
 import os
+import re
 from pathlib import Path
 from typing import Any
 
+from tools.json_codec import loads
+
 logger = logging.getLogger("themis.mcp_config")
 
+# ``${VAR_NAME}`` placeholders in server configuration values.
+_ENV_VAR_RE = re.compile(r"\$\{([^}]+)\}")
+
+
+def _replace_env_var(match: re.Match[str]) -> str:
+    var_name = match.group(1)
+    return os.getenv(var_name, f"${{{var_name}}}")
+
+
+@functools.lru_cache(maxsize=64)
+def _discover_config_path(cwd: str, home: str) -> str | None:
+    """Return the first ``.mcp.json`` in ``cwd``, its parents, or ``home``.
+
+    Cached per ``(cwd, home)`` so repeated ``MCPConfig()`` constructions skip
+    the stat walk up the directory tree; ``set_mcp_config`` clears it.
+    """
+    current = Path(cwd)
+    for directory in (current, *current.parents, Path(home)):
+        candidate = directory / ".mcp.json"
+        if candidate.exists():
+            return str(candidate)
+    return None
+
 
 class MCPConfig:
     """Manager for MCP server configurations."""
@@ -38,22 +65,9 @@ class MCPConfig:
             logger.warning(f"Specified MCP config not found: {config_path}")
             return None
 
-        # Check current directory
-        cwd_config = Path.cwd() / ".mcp.json"
-        if cwd_config.exists():
-            return cwd_config
-
-        # Check parent directories
-        current = Path.cwd()
-        for parent in current.parents:
-            parent_config = parent / ".mcp.json"
-            if parent_config.exists():
-                return parent_config
-
-        # Check home directory
-        home_config = Path.home() / ".mcp.json"
-        if home_config.exists():
-            return home_config
+        discovered = _discover_config_path(os.getcwd(), str(Path.home()))
+        if discovered is not None:
+            return Path(discovered)
 
         logger.info("No .mcp.json configuration file found")
         return None
@@ -65,8 +79,7 @@ class MCPConfig:
             return
 
         try:
-            with open(self.config_path) as f:
-                config = json.load(f)
+            config = loads(Path(self.config_path).read_bytes())
 
             servers = config.get("servers", {})
             for name, server_config in servers.items():
@@ -99,13 +112,7 @@ class MCPConfig:
         for key, value in config.items():
             if isinstance(value, str):
                 # Replace ${VAR_NAME} with environment variable value
-                import re
-
-                def replace_env(match: re.Match) -> str:
-                    var_name = match.group(1)
-                    return os.getenv(var_name, f"${{{var_name}}}")
-
-                expanded[key] = re.sub(r"\$\{([^}]+)\}", replace_env, value)
+                expanded[key] = _ENV_VAR_RE.sub(_replace_env_var, value)
             else:
                 expanded[key] = value
         return expanded
@@ -156,18 +163,27 @@ class MCPConfig:
 
 
 # Global singleton for easy access
-_mcp_config: MCPConfig | None = None
+_override_config: MCPConfig | None = None
+
+
+@functools.cache
+def _default_config() -> MCPConfig:
+    return MCPConfig()
 
 
 def get_mcp_config() -> MCPConfig:
     """Get or create the global MCP configuration instance."""
-    global _mcp_config
-    if _mcp_config is None:
-        _mcp_config = MCPConfig()
-    return _mcp_config
+    return _override_config or _default_config()
+
 
+def set_mcp_config(config: MCPConfig | None) -> None:
+    """Set the global MCP configuration instance (useful for testing).
 
-def set_mcp_config(config: MCPConfig) -> None:
-    """Set the global MCP configuration instance (useful for testing)."""
-    global _mcp_config
-    _mcp_config = config
+    Passing ``None`` drops the override and the default instance, and forgets
+    previously discovered ``.mcp.json`` locations, so the next
+    ``get_mcp_config()`` reloads from disk.
+    """
+    global _override_config
+    _override_config = config
+    _default_config.cache_clear()
+    _discover_config_path.cache_clear()
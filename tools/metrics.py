@@ -2,60 +2,108 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
+import array
+import bisect
+import itertools
+import threading
 from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from typing import Any
 
+# Key shared by every unlabelled series; skips building and sorting label items.
+_EMPTY_KEY: tuple[tuple[str, Any], ...] = ()
+
+_ESCAPE_TABLE = str.maketrans({"\\": r"\\", "\n": r"\n", '"': r"\""})
+
 
 def _escape_label_value(value: Any) -> str:
+    if type(value) is int or type(value) is float:
+        # Numeric text never contains a character that needs escaping.
+        return str(value)
     text = str(value)
-    return text.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+    if "\\" in text or "\n" in text or '"' in text:
+        return text.translate(_ESCAPE_TABLE)
+    return text
+
 
+def _format_key(key: tuple[tuple[str, Any], ...]) -> str:
+    """Format a canonical (already sorted) label tuple."""
 
-def _format_labels(labels: dict[str, Any]) -> str:
-    if not labels:
+    if not key:
         return ""
-    parts = [f'{key}="{_escape_label_value(value)}"' for key, value in sorted(labels.items())]
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in key]
     return "{" + ",".join(parts) + "}"
 
 
+def _format_bucket_labels(key: tuple[tuple[str, Any], ...]) -> tuple[str, str]:
+    """Split a bucket label set around its ``le`` label.
+
+    Takes a canonical label tuple and returns the text before and after
+    ``le="..."`` so each bucket line only splices in its upper bound; ``le``
+    keeps its sorted position and replaces any user-supplied ``le`` label.
+    """
+
+    before = [f'{name}="{_escape_label_value(value)}",' for name, value in key if name < "le"]
+    after = [f',{name}="{_escape_label_value(value)}"' for name, value in key if name > "le"]
+    return "{" + "".join(before), "".join(after) + "}"
+
+
 class CounterMetric:
     """Simple monotonically increasing counter."""
 
     def __init__(self, name: str, description: str) -> None:
         self.name = name
         self.description = description
-        self._values: dict[tuple[tuple[str, Any], ...], float] = defaultdict(float)
+        self._values: dict[tuple[tuple[str, Any], ...], float] = {}
+        # Label strings are formatted once, when a label set is first seen.
+        self._rendered: dict[tuple[tuple[str, Any], ...], str] = {}
+        self._sorted_keys: list[tuple[tuple[str, Any], ...]] | None = None
+        self._lock = threading.Lock()
 
     def inc(self, value: float = 1.0, **labels: Any) -> None:
         """Increment the counter for the provided label set."""
 
-        key = tuple(sorted(labels.items()))
-        self._values[key] += value
+        key = tuple(sorted(labels.items())) if labels else _EMPTY_KEY
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = 0.0
+                self._rendered[key] = _format_key(key)
+                self._sorted_keys = None
+            self._values[key] += value
 
     def samples(self) -> Iterator[tuple[dict[str, Any], float]]:
-        for key, value in self._values.items():
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
             yield dict(key), value
 
+    def _series_order(self) -> list[tuple[tuple[str, Any], ...]]:
+        # Keys are already canonical sorted tuples; re-sort only after a new series.
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self._values)
+        return self._sorted_keys
+
     def render(self) -> list[str]:
         lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
-        for labels, value in sorted(
-            self.samples(), key=lambda item: tuple(sorted(item[0].items()))
-        ):
-            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        with self._lock:
+            name, rendered, values = self.name, self._rendered, self._values
+            lines.extend([f"{name}{rendered[key]} {values[key]}" for key in self._series_order()])
         if len(lines) == 2:
             # Counters should still emit a zero sample to ensure discoverability.
             lines.append(f"{self.name} 0")
         return lines
 
     def reset(self) -> None:
-        self._values.clear()
+        with self._lock:
+            self._values.clear()
+            self._rendered.clear()
+            self._sorted_keys = None
 
 
-@dataclass
+@dataclass(slots=True)
 class _HistogramSample:
-    bucket_counts: list[int]
+    # Unsigned 64-bit slots instead of a list of boxed ints.
+    bucket_counts: array.array
     value_sum: float = 0.0
     value_count: int = 0
 
@@ -72,54 +120,87 @@ class HistogramMetric:
         self.name = name
         self.description = description
         self._buckets = bucket_list
+        self._le_labels = [
+            'le="+Inf"' if upper == float("inf") else f'le="{upper}"' for upper in bucket_list
+        ]
+        # Bucket lines, minus their count, emitted when nothing was observed.
+        self._bucket_templates = self._format_bucket_templates(_EMPTY_KEY)
         self._values: dict[tuple[tuple[str, Any], ...], _HistogramSample] = {}
+        # Per label set: the series label string and its bucket lines minus the
+        # count, formatted once when first observed.
+        self._rendered: dict[tuple[tuple[str, Any], ...], tuple[str, list[str]]] = {}
+        self._sorted_keys: list[tuple[tuple[str, Any], ...]] | None = None
+        self._lock = threading.Lock()
 
     def observe(self, value: float, **labels: Any) -> None:
         """Record an observation for the provided label set."""
 
-        key = tuple(sorted(labels.items()))
-        sample = self._values.setdefault(
-            key, _HistogramSample(bucket_counts=[0 for _ in self._buckets])
-        )
-        for index, upper in enumerate(self._buckets):
-            if value <= upper:
+        key = tuple(sorted(labels.items())) if labels else _EMPTY_KEY
+        # Counts are stored per bucket and made cumulative when read; the
+        # comparison keeps NaN out of every bucket, as a linear scan would.
+        index = bisect.bisect_left(self._buckets, value)
+        in_bucket = value <= self._buckets[index]
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = self._values[key] = _HistogramSample(
+                    bucket_counts=array.array("Q", [0]) * len(self._buckets)
+                )
+                self._rendered[key] = (_format_key(key), self._format_bucket_templates(key))
+                self._sorted_keys = None
+            if in_bucket:
                 sample.bucket_counts[index] += 1
-        sample.value_sum += value
-        sample.value_count += 1
+            sample.value_sum += value
+            sample.value_count += 1
 
     def samples(
         self,
     ) -> Iterator[tuple[dict[str, Any], list[int], float, int]]:
-        for key, sample in self._values.items():
-            yield dict(key), sample.bucket_counts, sample.value_sum, sample.value_count
+        with self._lock:
+            snapshot = [
+                (key, sample.bucket_counts[:], sample.value_sum, sample.value_count)
+                for key, sample in self._values.items()
+            ]
+        for key, bucket_counts, value_sum, value_count in snapshot:
+            yield dict(key), list(itertools.accumulate(bucket_counts)), value_sum, value_count
+
+    def _format_bucket_templates(self, key: tuple[tuple[str, Any], ...]) -> list[str]:
+        prefix, suffix = _format_bucket_labels(key)
+        return [f"{self.name}_bucket{prefix}{le_label}{suffix} " for le_label in self._le_labels]
+
+    def _series_order(self) -> list[tuple[tuple[str, Any], ...]]:
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self._values)
+        return self._sorted_keys
 
     def render(self) -> list[str]:
         lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
-        for labels, bucket_counts, value_sum, value_count in sorted(
-            self.samples(), key=lambda item: tuple(sorted(item[0].items()))
-        ):
-            cumulative = 0
-            for upper, bucket_value in zip(self._buckets, bucket_counts):
-                cumulative = bucket_value
-                upper_label = "+Inf" if upper == float("inf") else str(upper)
-                bucket_labels = labels | {"le": upper_label}
-                lines.append(
-                    f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+        name = self.name
+        with self._lock:
+            for key in self._series_order():
+                sample = self._values[key]
+                label_text, templates = self._rendered[key]
+                cumulative_counts = itertools.accumulate(sample.bucket_counts)
+                lines.extend(
+                    [
+                        f"{template}{cumulative}"
+                        for template, cumulative in zip(templates, cumulative_counts)
+                    ]
                 )
-            lines.append(f"{self.name}_count{_format_labels(labels)} {value_count}")
-            lines.append(f"{self.name}_sum{_format_labels(labels)} {value_sum}")
+                lines.append(f"{name}_count{label_text} {sample.value_count}")
+                lines.append(f"{name}_sum{label_text} {sample.value_sum}")
         if len(lines) == 2:
             # Emit empty histogram to satisfy Prometheus scrapes.
-            for upper in self._buckets:
-                upper_label = "+Inf" if upper == float("inf") else str(upper)
-                bucket_labels = {"le": upper_label}
-                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} 0")
+            lines.extend([f"{template}0" for template in self._bucket_templates])
             lines.append(f"{self.name}_count 0")
             lines.append(f"{self.name}_sum 0")
         return lines
 
     def reset(self) -> None:
-        self._values.clear()
+        with self._lock:
+            self._values.clear()
+            self._rendered.clear()
+            self._sorted_keys = None
 
 
 class MetricsRegistry:
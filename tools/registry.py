@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import bisect
 from collections.abc import Callable
 from typing import Any
 
@@ -11,9 +12,13 @@ class ToolRegistry:
 
     def __init__(self) -> None:
         self._tools: dict[str, Callable[..., Any]] = {}
+        # Kept sorted as names are registered, so listing never re-sorts.
+        self._sorted_names: list[str] = []
 
     def register(self, name: str, tool: Callable[..., Any]) -> None:
         """Register a callable tool by name."""
+        if name not in self._tools:
+            bisect.insort(self._sorted_names, name)
         self._tools[name] = tool
 
     def get(self, name: str) -> Callable[..., Any]:
@@ -22,4 +27,4 @@ class ToolRegistry:
 
     def available(self) -> list[str]:
         """List registered tool names."""
-        return sorted(self._tools)
+        return list(self._sorted_names)